@@ -1,105 +1,512 @@
 # app.py
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
 from flask_cors import CORS
+import os
+
+# Inference here is a handful of rows at a time, so BLAS/OpenMP thread pools only add
+# spin-up latency (and oversubscribe cores under gunicorn). Must be set before numpy loads.
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
 import pandas as pd
 import joblib
 import numpy as np
-import os
-from typing import Dict, Union
+import scipy.sparse as sp
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+try:
+    from forest_tables import build_leaf_vote_table, forest_fingerprint
+except ImportError:
+    # Imported as python_api.app (e.g. gunicorn python_api.app:app from the repo root)
+    from .forest_tables import build_leaf_vote_table, forest_fingerprint
+import functools
+import hashlib
+import orjson
+import queue
+import threading
+from typing import Annotated, Dict, Literal, Union
+from cachetools import TTLCache
+import msgspec
+
+try:
+    # Optional: JIT-compiles the batched health heuristic to native code
+    from numba import njit, float64
+except ImportError:
+    njit = None
+
+try:
+    # Optional: runs the job classifier's exported ONNX graph (see train_models.py)
+    import onnxruntime as ort
+except ImportError:
+    ort = None
 
 
 # --- CONFIGURATION (Paths updated to load models from the 'models' subdirectory) ---
-MODEL_DIR = "models"
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
 SALARY_MODEL_FILE = os.path.join(MODEL_DIR, "salary_predictor_model.joblib")
 SALARY_FEATURE_FILE = os.path.join(MODEL_DIR, "salary_model_features.joblib")
 JOB_MODEL_FILE = os.path.join(MODEL_DIR, "job_classifier_model.joblib")
 JOB_FEATURE_FILE = os.path.join(MODEL_DIR, "job_model_features.joblib")
+JOB_VOTES_FILE = os.path.join(MODEL_DIR, "job_leaf_votes.joblib")
+JOB_ONNX_FILE = os.path.join(MODEL_DIR, "job_classifier_model.onnx")
+
+# Prediction cache: identical payloads (app retries / re-renders) skip the models entirely
+PREDICTION_CACHE_SIZE = 4096
+PREDICTION_CACHE_TTL_SECONDS = 300
+
+# Request batching: requests that queue up while a batch is running are stacked into the next model call
+BATCH_MAX_SIZE = 64
+
+# Model input columns, as used in train_models.py
+FEATURE_COLS = ['education', 'location', 'title', 'industry', 'age', 'tenure_months', 'remote_flag']
 # ----------------------------------------------------------------------------------
 
 
+# --- REQUEST SCHEMA (mirrors UserProfile.toJson() in the Flutter app) ---
+# Bounded so out-of-range values get a 400 here rather than failing later (e.g. ints too big to serialize)
+class UserData(msgspec.Struct):
+    age: Annotated[int, msgspec.Meta(ge=0, le=150)]
+    tenure_months: Annotated[int, msgspec.Meta(ge=0, le=1200)]
+    remote_flag: Annotated[int, msgspec.Meta(ge=0, le=1)]
+    education: str
+    location: str
+    title: str
+    industry: str
+    avg_sleep_hours: Annotated[float, msgspec.Meta(ge=0, le=24)] = 7.5
+
+class TwinRequest(msgspec.Struct):
+    user_data: UserData
+    projection_months: Literal[6, 24, 60]
+
+# Parses and validates the whole body in one pass
+_request_decoder = msgspec.json.Decoder(TwinRequest)
+
+
+# --- 0. MODEL LOADING (once per process, not per request) ---
+@functools.lru_cache(maxsize=1)
+def get_models():
+    """
+    Loads the salary and job pipelines from disk. Cached so the pickles are
+    only deserialized once per process. The files are saved uncompressed, so
+    mmap_mode maps their numpy arrays read-only instead of copying them
+    (and the mapped pages are shared between gunicorn workers).
+    """
+    salary_pipeline = joblib.load(SALARY_MODEL_FILE, mmap_mode='r')
+    job_pipeline = joblib.load(JOB_MODEL_FILE, mmap_mode='r')
+    return salary_pipeline, job_pipeline
+
+SALARY_PIPELINE, JOB_PIPELINE = get_models()
+JOB_CLASSES = JOB_PIPELINE.named_steps['classifier'].classes_
+
+# Fitted pipeline steps, called directly to skip the Pipeline dispatch on every request
+SALARY_PREP = SALARY_PIPELINE.named_steps['preprocessor']
+SALARY_REG = SALARY_PIPELINE.named_steps['regressor']
+JOB_PREP = JOB_PIPELINE.named_steps['preprocessor']
+JOB_CLF = JOB_PIPELINE.named_steps['classifier']
+
+class OneHotLookupEncoder:
+    """
+    A fitted ColumnTransformer (OneHotEncoder + passthrough remainder, as built in
+    train_models.py) flattened into {category: output column} dicts, so encoding a row is
+    a few dict lookups writing ones into a zeroed array instead of a DataFrame round trip
+    through sklearn. transform() returns the same columns as preprocessor.transform, dense, in the given dtype.
+    Preprocessors with any other layout are passed through to preprocessor.transform.
+    """
+
+    def __init__(self, preprocessor, dtype=np.float64):
+        self.preprocessor = preprocessor
+        self.dtype = dtype
+        self.lookups = [] # [(input column, {category: output column})]
+        self.numeric = [] # [(input column, output column)]
+        self.n_features = 0
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == 'drop' or not len(columns):
+                continue
+            if not all(isinstance(col, str) for col in columns):
+                break
+            if isinstance(transformer, OneHotEncoder) and transformer.drop is None and transformer.handle_unknown == 'ignore' \
+                    and transformer.min_frequency is None and transformer.max_categories is None:
+                for col, categories in zip(columns, transformer.categories_):
+                    categories = categories.tolist()
+                    self.lookups.append((col, dict(zip(categories, range(self.n_features, self.n_features + len(categories))))))
+                    self.n_features += len(categories)
+            elif transformer == 'passthrough' or (isinstance(transformer, FunctionTransformer) and transformer.func is None):
+                for col in columns:
+                    self.numeric.append((col, self.n_features))
+                    self.n_features += 1
+            else:
+                break
+        else:
+            return
+        # Unsupported layout
+        self.lookups = self.numeric = None
+
+    def transform(self, rows) -> np.ndarray:
+        if self.lookups is None:
+            return self.preprocessor.transform(_features_frame(rows))
+
+        X = np.zeros((len(rows), self.n_features), dtype=self.dtype)
+        for i, row in enumerate(rows):
+            for col, lookup in self.lookups:
+                index = lookup.get(row[col]) # Unknown categories are ignored (all zeros)
+                if index is not None:
+                    X[i, index] = 1.0
+            for col, index in self.numeric:
+                X[i, index] = row[col]
+        return X
+
+SALARY_ENCODER = OneHotLookupEncoder(SALARY_PREP)
+# The forest evaluates on float32, so encode its input as float32 directly (no conversion copy)
+JOB_ENCODER = OneHotLookupEncoder(JOB_PREP, dtype=np.float32)
+
+# LinearRegression inference is just X @ coef_ + intercept_, so do the dot product ourselves
+SALARY_W = np.asarray(SALARY_REG.coef_, dtype=np.float64)
+SALARY_B = float(SALARY_REG.intercept_)
+
+# With one-hot inputs that dot product only ever picks one weight per categorical column,
+# so fold the encoder into the regression: {category: weight} per categorical column plus
+# (column, weight) per numeric column. Predicting a salary is then a few dict lookups and
+# multiplies in plain Python, with no feature matrix at all.
+if SALARY_ENCODER.lookups is not None:
+    SALARY_CONTRIB = [(col, {category: SALARY_W[index].item() for category, index in lookup.items()})
+                      for col, lookup in SALARY_ENCODER.lookups]
+    SALARY_NUMERIC_W = [(col, SALARY_W[index].item()) for col, index in SALARY_ENCODER.numeric]
+else:
+    SALARY_CONTRIB = SALARY_NUMERIC_W = None
+
+# Identifies the loaded forest; artifacts derived from it (vote table, ONNX export) must carry the same value
+JOB_FOREST_FINGERPRINT = forest_fingerprint(JOB_CLF)
+
+# The job ranking only needs per-class vote counts, not averaged probabilities: each tree
+# votes for the majority class of the leaf a row lands in. All trees' leaf -> class tables
+# are concatenated into one flat, quantized array, indexed by (tree offset + leaf id).
+def load_leaf_vote_table():
+    """
+    Loads the quantized vote table saved by train_models.py. Models trained before the
+    table existed, or a table whose fingerprint doesn't match the loaded forest, fall
+    back to building it from the trees' leaf values.
+    """
+    trees = [estimator.tree_ for estimator in JOB_CLF.estimators_]
+    try:
+        # Not memory-mapped like the pipelines: the table is small, so just read it into memory
+        table = joblib.load(JOB_VOTES_FILE)
+    except FileNotFoundError:
+        table = None
+    if table is None or table.get('fingerprint') != JOB_FOREST_FINGERPRINT:
+        if table is not None:
+            print(f"Ignoring {JOB_VOTES_FILE}: it doesn't match the loaded job classifier.")
+        table = build_leaf_vote_table(JOB_CLF)
+    return trees, table['offsets'], table['leaf_class']
+
+JOB_TREES, JOB_LEAF_OFFSETS, JOB_LEAF_CLASS = load_leaf_vote_table()
+
+def load_job_onnx_session():
+    """
+    Opens the ONNX export of the job classifier with onnxruntime, which evaluates the
+    whole forest in one fused C++ kernel. Returns None (tree-walk fallback) if
+    onnxruntime isn't installed, the file is missing, or it was exported from a
+    different forest than the loaded one (checked by fingerprint).
+    """
+    if ort is None or not os.path.exists(JOB_ONNX_FILE):
+        return None
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = 1 # Same reasoning as OMP_NUM_THREADS above
+    session = ort.InferenceSession(JOB_ONNX_FILE, sess_options=options, providers=['CPUExecutionProvider'])
+    metadata = session.get_modelmeta().custom_metadata_map
+    if metadata.get('forest_fingerprint') != JOB_FOREST_FINGERPRINT:
+        print(f"Ignoring {JOB_ONNX_FILE}: it doesn't match the loaded job classifier.")
+        return None
+    return session
+
+JOB_ONNX_SESSION = load_job_onnx_session()
+
+_prediction_cache = TTLCache(maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL_SECONDS)
+_prediction_cache_lock = threading.Lock()
+
+def _cache_key(twin_request: TwinRequest) -> bytes:
+    """
+    Canonical hash of a request's inputs: re-encoding the decoded struct fixes the
+    field order and fills in defaults, so equivalent payloads share a key.
+    """
+    return hashlib.blake2b(msgspec.json.encode(twin_request)).digest()
+
+
 # --- 1. HEALTH HEURISTIC FUNCTION ---
-def predict_health_increase(avg_sleep_hours: float) -> float:
+def predict_health_increase(avg_sleep_hours):
     """
     Simple rule-based heuristic for health increase factor based on sleep hours.
     Returns a factor (e.g., 1.10 for 10% increase).
+    Branchless, so it works on a scalar or on a numpy array of sleep hours at once:
+    full boost inside the optimal range, minus 5 points per hour of lack of sleep
+    and 2 points per hour of oversleeping, never below 0.
     """
     base_factor = 1.0
     optimal_sleep_min = 7.0
     optimal_sleep_max = 8.5
     max_increase_percent = 10.0 # Max health boost set to 10%
 
-    if optimal_sleep_min <= avg_sleep_hours <= optimal_sleep_max:
-        increase = max_increase_percent
-    elif avg_sleep_hours < optimal_sleep_min:
-        # Penalty for lack of sleep
-        deviation = optimal_sleep_min - avg_sleep_hours
-        increase = max(0, max_increase_percent - (deviation * 5))
-    else:
-        # Penalty for oversleeping
-        deviation = avg_sleep_hours - optimal_sleep_max
-        increase = max(0, max_increase_percent - (deviation * 2))
+    deviation_low = np.maximum(0.0, optimal_sleep_min - avg_sleep_hours) # Penalty for lack of sleep
+    deviation_high = np.maximum(0.0, avg_sleep_hours - optimal_sleep_max) # Penalty for oversleeping
+    increase = np.maximum(0.0, max_increase_percent - deviation_low * 5 - deviation_high * 2)
 
     return base_factor + (increase / 100.0)
 
-# --- 2. INTEGRATED PREDICTION FUNCTION ---
-def predict_future_twin(user_input_data: Dict[str, Union[int, float, str]], projection_months: int) -> Dict:
+# Array-only version used by the batch worker: compiled eagerly at import (explicit signature),
+# so the first request doesn't pay the JIT cost. Plain numpy if numba isn't installed.
+# No on-disk cache: it records the importing module's name, which differs between app and
+# python_api.app; with preload_app the compile happens once in the gunicorn master anyway.
+if njit is not None:
+    predict_health_increase_batch = njit(float64[:](float64[:]))(predict_health_increase)
+else:
+    predict_health_increase_batch = predict_health_increase
+
+# --- 2. REQUEST BATCHING ---
+class _BatchItem:
+    """A single queued model row plus the slot its results are written back to."""
+    __slots__ = ('row', 'sleep_hours', 'done', 'salary', 'job_scores', 'health_factor')
+
+    def __init__(self, row: Dict, sleep_hours: float):
+        self.row = row
+        self.sleep_hours = sleep_hours
+        self.done = threading.Event()
+        self.salary = None
+        self.job_scores = None
+        self.health_factor = None
+
+
+class PredictionBatcher:
+    """
+    Coalesces concurrent prediction requests into one pipeline call.
+    Each caller submits a single feature row and blocks while a background worker
+    takes every row already queued (it never waits for more, so a lone request is
+    dispatched immediately), runs both models once on the stacked rows, and hands
+    each caller back its own slice of the output.
+    """
+
+    def __init__(self, max_batch_size: int):
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, row: Dict, sleep_hours: float):
+        """
+        Queues a row and waits for its results.
+        Returns (salary, job_scores, health_factor); salary and job_scores may be an
+        Exception if that model failed for this row.
+        """
+        self._ensure_worker()
+        item = _BatchItem(row, sleep_hours)
+        self._queue.put(item)
+        item.done.wait()
+        return item.salary, item.job_scores, item.health_factor
+
+    def _ensure_worker(self):
+        # Started lazily so that forked server workers each get their own thread
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.max_batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._predict_batch(items)
+            except Exception as e:
+                for item in items:
+                    item.salary = item.job_scores = e
+            finally:
+                for item in items:
+                    item.done.set()
+
+    def _predict_batch(self, items):
+        # Health factors for the whole batch in one vectorized call
+        health_factors = predict_health_increase_batch(np.array([item.sleep_hours for item in items], dtype=np.float64))
+        for item, health_factor in zip(items, health_factors.tolist()):
+            item.health_factor = health_factor
+
+        # Concurrent users often send the same profile: predict each distinct row once
+        # and hand the result to every request that sent it
+        rows, row_index = _dedupe_rows([item.row for item in items])
+
+        # Salary Prediction
+        try:
+            salaries = _predict_salary_rows(rows)
+            for item, index in zip(items, row_index):
+                item.salary = salaries[index]
+        except Exception:
+            # A malformed row must not fail the rest of the batch
+            for item in items:
+                item.salary = self._predict_single(_predict_salary_rows, item.row)
+
+        # Job Classification
+        try:
+            scores = _predict_job_rows(rows)
+            for item, index in zip(items, row_index):
+                item.job_scores = scores[index]
+        except Exception:
+            for item in items:
+                item.job_scores = self._predict_single(_predict_job_rows, item.row)
+
+    @staticmethod
+    def _predict_single(predict_rows, row: Dict):
+        """Fallback: runs one row on its own so errors stay attached to the request that caused them."""
+        try:
+            return predict_rows([row])[0]
+        except Exception as e:
+            return e
+
+
+def _dedupe_rows(rows):
+    """
+    Returns (unique_rows, row_index) where rows[i] is equivalent to unique_rows[row_index[i]],
+    comparing rows on their FEATURE_COLS values.
+    """
+    positions = {}
+    unique_rows = []
+    row_index = []
+    for row in rows:
+        key = tuple(row[col] for col in FEATURE_COLS)
+        position = positions.get(key)
+        if position is None:
+            position = positions[key] = len(unique_rows)
+            unique_rows.append(row)
+        row_index.append(position)
+    return unique_rows, row_index
+
+
+def _predict_salary_rows(rows) -> list:
+    """Predicted salaries (Python floats) for raw feature rows, via the folded lookup tables."""
+    if SALARY_CONTRIB is None:
+        return _predict_salaries(SALARY_ENCODER.transform(rows)).tolist()
+
+    salaries = []
+    for row in rows:
+        # Accumulated in feature column order, then the intercept, like the sparse dot product
+        salary = 0.0
+        for col, contrib in SALARY_CONTRIB:
+            salary += contrib.get(row[col], 0.0) # Unknown categories contribute nothing
+        for col, weight in SALARY_NUMERIC_W:
+            salary += weight * row[col]
+        salaries.append(salary + SALARY_B)
+    return salaries
+
+
+def _predict_salaries(X) -> np.ndarray:
+    """Salary regression on preprocessed features (sparse or dense), bypassing LinearRegression.predict."""
+    return X @ SALARY_W + SALARY_B
+
+
+def _predict_job_rows(rows) -> np.ndarray:
+    """Job scores for raw feature rows."""
+    return _predict_job_scores(JOB_ENCODER.transform(rows))
+
+
+def _predict_job_scores(X) -> np.ndarray:
+    """
+    Per-class job scores, shape (n_rows, n_classes), on preprocessed features; only their
+    ranking is used. Class probabilities from onnxruntime when the ONNX export is
+    available, otherwise tree vote counts.
+    """
+    if JOB_ONNX_SESSION is None:
+        return _predict_job_votes(X)
+    if sp.issparse(X):
+        X = X.toarray()
+    return JOB_ONNX_SESSION.run(['probabilities'], {'input': np.ascontiguousarray(X, dtype=np.float32)})[0]
+
+
+def _predict_job_votes(X) -> np.ndarray:
+    """
+    Per-class tree vote counts, shape (n_rows, n_classes), on preprocessed features.
+    Walks each tree directly (one float32 conversion for the whole forest) instead of
+    summing 100 float64 predict_proba matrices.
+    """
+    if sp.issparse(X):
+        X = sp.csr_matrix(X, dtype=np.float32)
+    else:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+
+    leaves = np.column_stack([tree.apply(X) for tree in JOB_TREES]) # (n_rows, n_trees)
+    classes = JOB_LEAF_CLASS[leaves + JOB_LEAF_OFFSETS]
+
+    n_rows, n_classes = classes.shape[0], len(JOB_CLASSES)
+    flat = (np.arange(n_rows)[:, None] * n_classes + classes).ravel()
+    return np.bincount(flat, minlength=n_rows * n_classes).reshape(n_rows, n_classes)
+
+
+def _features_frame(rows):
+    """
+    Builds the model input DataFrame column by column (much cheaper than the
+    list-of-dicts constructor) with only the FEATURE_COLS, in order.
+    Only needed when a preprocessor can't be flattened by OneHotLookupEncoder.
+    """
+    return pd.DataFrame({col: [row[col] for row in rows] for col in FEATURE_COLS}, columns=FEATURE_COLS)
+
+
+prediction_batcher = PredictionBatcher(max_batch_size=BATCH_MAX_SIZE)
+
+
+# --- 3. INTEGRATED PREDICTION FUNCTION ---
+def predict_future_twin(user_input_data: UserData, projection_months: int) -> Dict:
     """
     Core logic to predict the future state of the Digital Twin.
     """
 
     # --- Time Projection ---
     age_increase_years = projection_months // 12
-    projected_age = user_input_data['age'] + age_increase_years
-    projected_tenure = user_input_data['tenure_months'] + projection_months
+    projected_age = user_input_data.age + age_increase_years
+    projected_tenure = user_input_data.tenure_months + projection_months
+
+    # --- Batched Predictions (Health, Salary and Job) ---
+    # The user's current data (features) with the projected age/tenure; the batcher
+    # stacks it with any concurrent requests before running the ML models
+    twin_row = {
+        'education': user_input_data.education,
+        'location': user_input_data.location,
+        'title': user_input_data.title,
+        'industry': user_input_data.industry,
+        'age': projected_age,
+        'tenure_months': projected_tenure,
+        'remote_flag': user_input_data.remote_flag
+    }
+    salary_result, scores_result, sleep_factor = prediction_batcher.submit(twin_row, user_input_data.avg_sleep_hours)
 
     # --- Health Prediction ---
-    # Use .get with a default value to safely access sleep hours
-    sleep_factor = predict_health_increase(user_input_data.get('avg_sleep_hours', 7.5))
     health_percent_increase = (sleep_factor - 1.0) * 100
 
-    # --- Setup DataFrame for ML Models ---
-    # Create a DataFrame with the user's current data (features)
-    twin_df = pd.DataFrame([{
-        **user_input_data, # Includes original categorical features
-        'age': projected_age,
-        'tenure_months': projected_tenure
-    }])
-
-    # --- Career Prediction (Salary and Job) ---
     predicted_salary = None
     recommended_jobs = None
 
     # Salary Prediction
     try:
-        # Load the entire pipeline (preprocessor + model)
-        salary_pipeline = joblib.load(SALARY_MODEL_FILE)
-
-        # NOTE: We load the feature list but the pipeline handles selection and encoding
-        # We ensure the input DataFrame has all necessary columns defined in train_models.py
-
-        # Prepare data by explicitly selecting necessary columns used in the training script
-        X_salary = twin_df[['education', 'location', 'title', 'industry', 'age', 'tenure_months', 'remote_flag']]
-
-        # Predict uses the pipeline to preprocess and then predict
-        predicted_salary = salary_pipeline.predict(X_salary)[0]
+        if isinstance(salary_result, Exception):
+            raise salary_result
+        predicted_salary = salary_result
     except Exception as e:
         print(f"Error in Salary Prediction: {e}. Ensure models are trained and saved correctly.")
-        predicted_salary = -1.0
+        predicted_salary = None
 
     # Job Classification (Next Job Title)
     try:
-        # Load the entire pipeline (preprocessor + model)
-        job_pipeline = joblib.load(JOB_MODEL_FILE)
-
-        # Prepare data by explicitly selecting necessary columns used in the training script
-        X_job = twin_df[['education', 'location', 'title', 'industry', 'age', 'tenure_months', 'remote_flag']]
-
-        # Predict probabilities to get the top likely jobs
-        probas = job_pipeline.predict_proba(X_job)[0]
-        classes = job_pipeline.named_steps['classifier'].classes_
+        if isinstance(scores_result, Exception):
+            raise scores_result
+        scores = scores_result
 
-        top_indices = np.argsort(probas)[::-1][:3] # Get top 3 indices
-        recommended_jobs = [classes[i] for i in top_indices]
+        # Top 3 indices: O(n) partition, then order just those 3 by score (fewer if the
+        # classifier knows fewer than 3 jobs)
+        k = min(3, len(scores))
+        top_part = np.argpartition(scores, -k)[-k:]
+        top_indices = top_part[np.argsort(scores[top_part])[::-1]]
+        recommended_jobs = [JOB_CLASSES[i] for i in top_indices]
 
     except Exception as e:
         print(f"Error in Job Classification: {e}. Ensure models are trained and saved correctly.")
@@ -107,19 +514,48 @@ def predict_future_twin(user_input_data: Dict[str, Union[int, float, str]], proj
 
     # --- Final Results Package ---
     return {
-        "projected_age": int(projected_age),
+        "projected_age": projected_age,
         "health_increase_percent": round(health_percent_increase, 1),
-        # Convert prediction to float and format, handling the error case
-        "predicted_salary": round(float(predicted_salary), 2) if isinstance(predicted_salary, (float, np.float64)) and predicted_salary != -1.0 else "N/A",
+        # The salary is always a Python float, or None if the prediction failed
+        "predicted_salary": round(predicted_salary, 2) if predicted_salary is not None else "N/A",
         "recommended_jobs": recommended_jobs,
         "time_projection_months": projection_months
     }
 
-# --- 3. FLASK APP SETUP ---
+def warm_up_models():
+    """
+    Runs one synthetic row through the salary, job and health predictions at startup so
+    lazy imports, first-call allocations and onnxruntime initialisation are paid before
+    the first real request. Calls the model functions directly rather than through the
+    batcher, so no worker thread is started before gunicorn forks.
+    """
+    row = {
+        'education': 'bachelor', 'location': 'Remote', 'title': 'engineer', 'industry': 'IT',
+        'age': 30, 'tenure_months': 12, 'remote_flag': 0
+    }
+    try:
+        _predict_salary_rows([row])
+        _predict_job_rows([row])
+        predict_health_increase_batch(np.array([7.5]))
+    except Exception as e:
+        print(f"Model warm-up failed: {e}")
+
+warm_up_models()
+
+# --- 4. FLASK APP SETUP ---
 app = Flask(__name__)
 
 CORS(app) # Crucial for allowing Flutter (frontend) to connect
 
+def json_response(body: Union[Dict, bytes], status: int = 200) -> Response:
+    """
+    Builds a JSON response with orjson (much faster than jsonify, and serializes
+    numpy scalars/arrays directly). Accepts a dict or an already serialized body.
+    """
+    if not isinstance(body, bytes):
+        body = orjson.dumps(body, option=orjson.OPT_SERIALIZE_NUMPY)
+    return Response(body, status=status, mimetype='application/json')
+
 @app.route('/predict_twin', methods=['POST'])
 def handle_prediction():
     """
@@ -127,30 +563,37 @@ def handle_prediction():
     """
 
     if not request.is_json:
-        return jsonify({"error": "Request must be JSON"}), 400
-
-    data = request.json
+        return json_response({"error": "Request must be JSON"}, 400)
 
-    # Validation
-    if not all(key in data for key in ['user_data', 'projection_months']):
-        return jsonify({"error": "Missing 'user_data' or 'projection_months'."}), 400
-
-    user_data = data['user_data']
-    projection_months = data['projection_months']
-
-    if not isinstance(projection_months, int) or projection_months not in [6, 24, 60]:
-        return jsonify({"error": "Invalid 'projection_months'. Must be 6, 24, or 60."}), 400
+    # Validation: parses the body straight into a typed TwinRequest
+    try:
+        twin_request = _request_decoder.decode(request.get_data())
+    except msgspec.ValidationError as e:
+        return json_response({"error": f"Invalid request: {e}"}, 400)
+    except msgspec.DecodeError:
+        return json_response({"error": "Request body is not valid JSON"}, 400)
 
     try:
-        # Run the core prediction logic
-        prediction_result = predict_future_twin(user_data, projection_months)
-        return jsonify(prediction_result)
+        # Return the cached (already serialized) result for a repeated payload, otherwise run the core prediction logic
+        key = _cache_key(twin_request)
+        with _prediction_cache_lock:
+            response_body = _prediction_cache.get(key)
+        if response_body is None:
+            prediction_result = predict_future_twin(twin_request.user_data, twin_request.projection_months)
+            response_body = orjson.dumps(prediction_result, option=orjson.OPT_SERIALIZE_NUMPY)
+            # Only cache complete results: a model failure ("N/A") shouldn't be replayed for the whole TTL
+            if prediction_result["predicted_salary"] != "N/A" and prediction_result["recommended_jobs"] != ["N/A"]:
+                with _prediction_cache_lock:
+                    _prediction_cache[key] = response_body
+        return json_response(response_body)
     except Exception as e:
         print(f"Unhandled server error: {e}")
-        return jsonify({"error": f"Internal server error: {e}"}), 500
+        return json_response({"error": f"Internal server error: {e}"}, 500)
 
-# --- 4. RUN THE SERVER ---
+# --- 5. RUN THE SERVER ---
 if __name__ == '__main__':
+    # Development server only; in production run under gunicorn (see gunicorn.conf.py):
+    #   gunicorn -c gunicorn.conf.py app:app
     # Use 0.0.0.0 to make the server accessible from outside the local machine (like your phone/emulator)
     print("Starting Digital Twin Prediction API on port 5000...")
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
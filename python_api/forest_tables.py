@@ -0,0 +1,32 @@
+# forest_tables.py
+# Helpers shared by train_models.py (which saves these artifacts) and app.py (which checks and loads them)
+import hashlib
+import numpy as np
+
+
+def forest_fingerprint(classifier) -> str:
+    """
+    Hex digest identifying a fitted RandomForestClassifier: its classes and every tree's
+    structure and leaf values. Saved next to artifacts derived from the forest (vote table,
+    ONNX export) so app.py can tell whether they belong to the model it loaded.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(np.asarray(classifier.classes_).tolist()).encode())
+    for estimator in classifier.estimators_:
+        tree = estimator.tree_
+        for array in (tree.children_left, tree.children_right, tree.feature, tree.threshold, tree.value):
+            digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def build_leaf_vote_table(classifier):
+    """
+    Quantizes a fitted RandomForestClassifier into a flat leaf -> class vote table.
+    Each node stores only the index of its majority class (in the smallest unsigned int type
+    that fits), concatenated across trees; offsets give each tree's start in the table.
+    """
+    trees = [estimator.tree_ for estimator in classifier.estimators_]
+    vote_dtype = np.min_scalar_type(len(classifier.classes_) - 1)
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+    leaf_class = np.concatenate([tree.value[:, 0, :].argmax(axis=1) for tree in trees]).astype(vote_dtype)
+    return {'fingerprint': forest_fingerprint(classifier), 'offsets': offsets, 'leaf_class': leaf_class}
@@ -0,0 +1,14 @@
+# gunicorn.conf.py
+# Production server config: gunicorn -c gunicorn.conf.py app:app (run from python_api/)
+import multiprocessing
+
+bind = "0.0.0.0:5000"
+
+# One process per core, each with a few threads so concurrent requests can be micro-batched
+workers = multiprocessing.cpu_count()
+worker_class = "gthread"
+threads = 4
+
+# Load app.py (and the model pipelines) once in the master before forking, so the
+# workers share the loaded models copy-on-write instead of each loading their own
+preload_app = True
@@ -0,0 +1,95 @@
+# test_app.py
+# Checks the hand-written inference paths in app.py against the fitted sklearn pipelines they replace.
+# Run from python_api/: python -m pytest -q
+import random
+
+import numpy as np
+import pytest
+
+import app
+
+
+def _sample_rows(n=300, seed=0):
+    """Feature rows mixing known categories with ones the encoders have never seen."""
+    rng = random.Random(seed)
+    cat = app.SALARY_PREP.named_transformers_['cat']
+    known = {col: categories.tolist() for col, categories in zip(['education', 'location', 'title', 'industry'], cat.categories_)}
+    rows = []
+    for _ in range(n):
+        row = {col: rng.choice(values + ['unknown_' + col]) for col, values in known.items()}
+        row.update(age=rng.randint(18, 70), tenure_months=rng.randint(0, 300), remote_flag=rng.randint(0, 1))
+        rows.append(row)
+    return rows
+
+
+ROWS = _sample_rows()
+
+
+def _top3_probabilities(probas, scores):
+    """Pipeline probabilities of the (up to) 3 classes ranked highest by scores."""
+    k = min(3, len(scores))
+    top_part = np.argpartition(scores, -k)[-k:]
+    return probas[top_part[np.argsort(scores[top_part])[::-1]]]
+
+
+def test_salary_matches_pipeline():
+    expected = app.SALARY_PIPELINE.predict(app._features_frame(ROWS))
+    np.testing.assert_allclose(app._predict_salary_rows(ROWS), expected, rtol=1e-12)
+
+
+def test_salary_matrix_path_matches_pipeline():
+    expected = app.SALARY_PIPELINE.predict(app._features_frame(ROWS))
+    np.testing.assert_allclose(app._predict_salaries(app.SALARY_ENCODER.transform(ROWS)), expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize('encoder, preprocessor', [
+    (app.SALARY_ENCODER, app.SALARY_PREP),
+    (app.JOB_ENCODER, app.JOB_PREP),
+])
+def test_lookup_encoder_matches_preprocessor(encoder, preprocessor):
+    assert encoder.lookups is not None # the shipped models use the fast path
+    expected = preprocessor.transform(app._features_frame(ROWS))
+    expected = expected.toarray() if hasattr(expected, 'toarray') else expected
+    np.testing.assert_array_equal(encoder.transform(ROWS), expected.astype(encoder.dtype))
+
+
+@pytest.mark.parametrize('predict_scores', [app._predict_job_votes, app._predict_job_scores])
+def test_job_top3_matches_pipeline(predict_scores):
+    probas = app.JOB_PIPELINE.predict_proba(app._features_frame(ROWS))
+    scores = predict_scores(app.JOB_ENCODER.transform(ROWS))
+    assert scores.shape == probas.shape
+    for row_probas, row_scores in zip(probas, scores):
+        # Compared by probability so equally likely classes may come in either order
+        expected = np.sort(row_probas)[::-1][:3]
+        np.testing.assert_allclose(_top3_probabilities(row_probas, row_scores), expected, atol=1e-6)
+
+
+def test_onnx_export_top3_matches_pipeline(tmp_path, monkeypatch):
+    pytest.importorskip('skl2onnx')
+    pytest.importorskip('onnxruntime')
+    import train_models
+
+    path = str(tmp_path / 'job_classifier_model.onnx')
+    train_models.export_classifier_to_onnx(app.JOB_PIPELINE, path)
+    monkeypatch.setattr(app, 'JOB_ONNX_FILE', path)
+    session = app.load_job_onnx_session()
+    assert session is not None # fingerprint matches the loaded forest
+    monkeypatch.setattr(app, 'JOB_ONNX_SESSION', session)
+
+    test_job_top3_matches_pipeline(app._predict_job_scores)
+
+
+def test_predict_future_twin_matches_pipeline():
+    user = app.UserData(age=30, tenure_months=12, remote_flag=1, education='master',
+                        location='Pune', title='engineer', industry='unknown_industry')
+    result = app.predict_future_twin(user, 24)
+
+    features = app._features_frame([{
+        'education': 'master', 'location': 'Pune', 'title': 'engineer', 'industry': 'unknown_industry',
+        'age': 32, 'tenure_months': 36, 'remote_flag': 1
+    }])
+    assert result['predicted_salary'] == round(float(app.SALARY_PIPELINE.predict(features)[0]), 2)
+
+    probas = app.JOB_PIPELINE.predict_proba(features)[0]
+    recommended = [list(app.JOB_CLASSES).index(job) for job in result['recommended_jobs']]
+    np.testing.assert_allclose(probas[recommended], np.sort(probas)[::-1][:3])